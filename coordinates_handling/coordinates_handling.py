@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from coordinates_handling.shapes_filter import CoordinatesShapesIndex, ShapesFilter
 from errors.status_store import StatusStore
 from errors import exceptions
 from helpers.custom_types import ShapeCoords
+from helpers.file_signature import get_file_signature
 from map_rendering.shapes import QGraphicsSceneShape, QGraphicsSceneShapes
 
 
@@ -16,7 +18,7 @@ class AbstractCoordinatesRetriever(ABC):
 
 class AbstractCoordinatesWriter(ABC):
     @abstractmethod
-    def save(self) -> None:
+    def save(self) -> bool:
         pass
 
 
@@ -37,7 +39,7 @@ class CoordinatesWriterFile(CoordinatesFileHandlerMixin, AbstractCoordinatesWrit
         self.file_path = ''
         self.status_store = status_store
 
-    def save(self, coords_list: List[ShapeCoords]) -> None:
+    def save(self, coords_list: List[ShapeCoords]) -> bool:
         """Save coords to file, each ShapeCoords entry in one line, delimited by spaces
 
         Args:
@@ -46,6 +48,9 @@ class CoordinatesWriterFile(CoordinatesFileHandlerMixin, AbstractCoordinatesWrit
         Raises:
             exceptions.CoordsFileNonExistentError: raised if file does not exist
             exceptions.CoordsFileWriteOpenError: raised if file is not writable
+
+        Returns:
+            bool: True if file is saved
         """
         try:
             self.check_file_existense()
@@ -57,8 +62,10 @@ class CoordinatesWriterFile(CoordinatesFileHandlerMixin, AbstractCoordinatesWrit
                 coords_file.writelines([' '.join(map(str, coords)) + '\n' for coords in coords_list])
 
             self.status_store.add_status(f"Документ сохранён без ошибок.")
+            return True
         except (exceptions.CoordsFileNonExistentError, exceptions.CoordsFileWriteOpenError) as exception:
             self.status_store.add_status(exception.msg.format(self.file_path))
+            return False
 
 
 class CoordinatesRetrieverFile(CoordinatesFileHandlerMixin, AbstractCoordinatesRetriever):
@@ -193,6 +200,10 @@ class CoordinatesHandler:
         self.writer = CoordinatesWriterFile(status_store=status_store)
         self.translator = CoordinatesQGraphicsSceneShapeTranslator()
         self.shapes_map = {}
+        self.shapes_index = CoordinatesShapesIndex()
+        self.shapes_filter: Optional[ShapesFilter] = None
+        # Source file size and modification time the shapes (and their positions) correspond to
+        self.source_signature: Tuple[int, int] = (-1, -1)
 
     def retrieve_coords(self, file_path: str = '') -> None:
         """Retrieve coordinates and store them as shapes
@@ -200,21 +211,50 @@ class CoordinatesHandler:
         Args:
             file_path (str, optional): path to coordinates file. Defaults to ''.
         """
+        # Taken before reading, so a change made during reading is detected later
+        source_signature = get_file_signature(file_path)
         self.retriever.set_file_path(file_path)
         coords_list = self.retriever.retrieve()
         self.translate_coords_to_shapes(coords_list=coords_list)
+        self.source_signature = source_signature
+
+    def load_coords(self, file_path: str, coords_list: List[ShapeCoords], source_signature: Tuple[int, int]) -> None:
+        """Store already parsed coordinates (e.g. from session cache) as shapes, skipping file retrieval
 
-    def save_coords(self, file_path: str = '') -> None:
+        Args:
+            file_path (str): path to coordinates file coords_list was parsed from
+            coords_list (List[ShapeCoords]): list of ShapeCoords
+            source_signature (Tuple[int, int]): file size and modification time at parsing time
+        """
+        self.retriever.set_file_path(file_path)
+        self.translate_coords_to_shapes(coords_list=coords_list)
+        self.source_signature = source_signature
+
+    def save_coords(self, file_path: str = '') -> bool:
         """Get current shapes' coords and store them to file
 
         Args:
             file_path (str, optional): path to saving file. Defaults to ''.
+
+        Returns:
+            bool: True if file is saved
         """
         self.writer.set_file_path(file_path)
-        self.writer.save(self.translate_shapes_to_coords())
+        coords_list = self.translate_shapes_to_coords()
+        if not self.writer.save(coords_list):
+            return False
+
+        # Saved file (possibly not the one shapes were retrieved from) becomes coordinates source.
+        # It contains remaining shapes only, so positions are renumbered
+        self.retriever.set_file_path(file_path)
+        self.source_signature = get_file_signature(file_path)
+        self.shapes_index.drop_removed()
+        return True
 
     def translate_coords_to_shapes(self, coords_list: List[ShapeCoords]) -> None:
         self.shapes_map = self.translator.translate_to_shapes(coords_list=coords_list)
+        self.shapes_index.reset(shape_ids=list(self.shapes_map), coords_list=coords_list)
+        self.shapes_filter = None
 
     def translate_shapes_to_coords(self) -> List[ShapeCoords]:
         return self.translator.translate_to_coords(shapes=self.get_shapes())
@@ -224,3 +264,73 @@ class CoordinatesHandler:
 
     def remove_shape(self, id: int):
         self.shapes_map.pop(id)
+        self.shapes_index.remove_shape(shape_id=id)
+
+    def remove_shapes_by_positions(self, positions: Iterable[int]) -> None:
+        """Remove shapes in bulk by their positions in coordinates source (used on session restore)
+
+        Args:
+            positions (Iterable[int]): shapes' positions
+        """
+        shape_ids = self.shapes_index.shape_ids
+        for position in positions:
+            if 0 <= position < len(shape_ids) and shape_ids[position] in self.shapes_map:
+                self.remove_shape(id=shape_ids[position])
+
+    def get_removed_positions(self) -> List[int]:
+        return self.shapes_index.get_removed_positions()
+
+    def get_shape_position(self, shape: Optional[QGraphicsSceneShape]) -> int:
+        """Get shape position in coordinates source
+
+        Args:
+            shape (Optional[QGraphicsSceneShape]): shape
+
+        Returns:
+            int: shape position, -1 if shape is None or unknown
+        """
+        return self.shapes_index.shape_positions.get(id(shape), -1)
+
+    def get_shape_by_position(self, position: int) -> Optional[QGraphicsSceneShape]:
+        if not 0 <= position < len(self.shapes_index.shape_ids):
+            return None
+        return self.shapes_map.get(self.shapes_index.shape_ids[position])
+
+    def get_source_file_path(self) -> str:
+        return self.retriever.file_path
+
+    def get_source_signature(self) -> Tuple[int, int]:
+        """Get source file size and modification time shapes' positions correspond to
+        """
+        return self.source_signature
+
+    def get_source_coords(self) -> List[ShapeCoords]:
+        """Get coords of all shapes (removed ones included) in coordinates source order
+        """
+        return self.shapes_index.coords_list
+
+    def set_shapes_filter(self, shapes_filter: Optional[ShapesFilter]) -> bytearray:
+        """Set current shapes filter
+
+        Args:
+            shapes_filter (Optional[ShapesFilter]): filter criteria, None to show all shapes
+
+        Returns:
+            bytearray: visibility flags aligned with get_shape_ids()
+        """
+        self.shapes_filter = shapes_filter
+        return self.get_visible_mask()
+
+    def get_visible_mask(self) -> bytearray:
+        """Get visibility flags of shapes (not removed and passing the current filter)
+
+        Returns:
+            bytearray: visibility flags aligned with get_shape_ids()
+        """
+        return self.shapes_index.get_visible_mask(shapes_filter=self.shapes_filter)
+
+    def get_shape_ids(self) -> List[int]:
+        """Get ids of all shapes (removed ones included) in coordinates source order.
+           The list is replaced (not modified) when positions change
+        """
+        return self.shapes_index.shape_ids
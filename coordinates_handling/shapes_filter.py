@@ -0,0 +1,216 @@
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import accumulate, chain, compress, repeat
+from math import hypot
+from operator import add, and_, ge, gt, le, mul, not_, rshift, sub
+from typing import Dict, Iterable, List, Optional
+
+from helpers.custom_types import ShapeBBox, ShapeCoords
+
+
+class ShapeType:
+    """Shape types, determined by coordinates count (same rule as CoordinatesQGraphicsSceneShapeTranslator)
+    """
+    DOT = 'dot'
+    LINE = 'line'
+    POLYGON = 'polygon'
+
+
+# Vertices count of shapes other than polygons (2 and 4 coordinates)
+VERTICES_DOT = 1
+VERTICES_LINE = 2
+VERTICES_SHAPE_TYPES = {VERTICES_DOT: ShapeType.DOT, VERTICES_LINE: ShapeType.LINE}
+
+
+class ShapesFilter:
+    """Shapes filter criteria, criterion set to None is not applied
+    """
+
+    def __init__(self,
+                 shape_types: Optional[Iterable[str]] = None,
+                 min_vertices: Optional[int] = None,
+                 bbox: Optional[ShapeBBox] = None,
+                 min_length: Optional[float] = None) -> None:
+        """
+        Args:
+            shape_types (Iterable[str], optional): ShapeType values to keep. Defaults to None.
+            min_vertices (int, optional): keep shapes with more than min_vertices vertices. Defaults to None.
+            bbox (ShapeBBox, optional): keep shapes lying entirely inside the bounding box. Defaults to None.
+            min_length (float, optional): keep shapes longer than min_length (line length,
+                polygon perimeter). Defaults to None.
+        """
+        self.shape_types = None if shape_types is None else frozenset(shape_types)
+        self.min_vertices = min_vertices
+        self.bbox = bbox
+        self.min_length = min_length
+
+
+class ShapesColumns:
+    """Shapes' attribute columns, aligned with shapes' positions in coordinates source
+    """
+
+    def __init__(self,
+                 shape_types: List[str],
+                 vertices: array,
+                 x_min: array,
+                 y_min: array,
+                 x_max: array,
+                 y_max: array,
+                 lengths: array) -> None:
+        self.shape_types = shape_types
+        self.vertices = vertices
+        self.x_min = x_min
+        self.y_min = y_min
+        self.x_max = x_max
+        self.y_max = y_max
+        self.lengths = lengths
+
+    @classmethod
+    def from_coords(cls, coords_list: List[ShapeCoords]) -> 'ShapesColumns':
+        """Build columns from coordinates flattened into one buffer (as in CoordinatesCache): per-shape values
+           are computed by C-level map() over slices of the buffer instead of a Python loop over shapes
+
+        Args:
+            coords_list (List[ShapeCoords]): shapes' coords
+
+        Returns:
+            ShapesColumns: columns
+        """
+        coords_flat = list(chain.from_iterable(coords_list))
+        xs = coords_flat[0::2]
+        ys = coords_flat[1::2]
+        # Shapes' first and past-the-end vertex indices in xs/ys
+        vertex_offsets = list(map(rshift, accumulate(map(len, coords_list), initial=0), repeat(1)))
+        starts = vertex_offsets[:-1]
+        ends = vertex_offsets[1:]
+        lasts = list(map(sub, ends, repeat(1)))
+
+        vertices = array('q', map(sub, ends, starts))
+        shape_types = list(map(VERTICES_SHAPE_TYPES.get, vertices, repeat(ShapeType.POLYGON)))
+
+        # Slice objects are created on the fly: a materialized list of millions of them (they are tracked
+        # by cyclic garbage collector) makes the collector traverse all coords lists over and over
+        # Segments between all consecutive vertices, shape's segments are [start, last) slice of them
+        segments = list(map(hypot, map(sub, xs[1:], xs), map(sub, ys[1:], ys)))
+        lengths = map(sum, map(segments.__getitem__, map(slice, starts, lasts)))
+        closing_segments = map(
+            hypot,
+            map(sub, map(xs.__getitem__, starts), map(xs.__getitem__, lasts)),
+            map(sub, map(ys.__getitem__, starts), map(ys.__getitem__, lasts)),
+        )
+        is_polygon = map(gt, vertices, repeat(VERTICES_LINE))
+
+        return cls(
+            shape_types=shape_types,
+            vertices=vertices,
+            x_min=array('d', map(min, map(xs.__getitem__, map(slice, starts, ends)))),
+            y_min=array('d', map(min, map(ys.__getitem__, map(slice, starts, ends)))),
+            x_max=array('d', map(max, map(xs.__getitem__, map(slice, starts, ends)))),
+            y_max=array('d', map(max, map(ys.__getitem__, map(slice, starts, ends)))),
+            lengths=array('d', map(add, lengths, map(mul, closing_segments, is_polygon))),
+        )
+
+    def compress(self, selectors: List[bool]) -> 'ShapesColumns':
+        return ShapesColumns(
+            shape_types=list(compress(self.shape_types, selectors)),
+            vertices=array('q', compress(self.vertices, selectors)),
+            x_min=array('d', compress(self.x_min, selectors)),
+            y_min=array('d', compress(self.y_min, selectors)),
+            x_max=array('d', compress(self.x_max, selectors)),
+            y_max=array('d', compress(self.y_max, selectors)),
+            lengths=array('d', compress(self.lengths, selectors)),
+        )
+
+
+class CoordinatesShapesIndex:
+    """Columnar storage of shapes' attributes. Filters are evaluated as masks over whole columns
+       instead of checking every criterion for every shape object.
+
+       Shape positions and removed flags are set at once (they are cheap), attribute columns are built
+       in a background thread right after coordinates are set, so neither loading nor filtering waits for them
+       (unless filter is applied before the build is finished).
+    """
+
+    def __init__(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.columns_future: Optional[Future] = None
+        self.reset(shape_ids=[], coords_list=[])
+
+    def reset(self, shape_ids: List[int], coords_list: List[ShapeCoords]) -> None:
+        """Set shapes in coordinates source order, start building columns in background
+
+        Args:
+            shape_ids (List[int]): shapes' ids
+            coords_list (List[ShapeCoords]): shapes' coords, aligned with shape_ids
+        """
+        self.shape_ids = shape_ids
+        self.coords_list = coords_list
+        self.shape_positions: Dict[int, int] = dict(zip(shape_ids, range(len(shape_ids))))
+        self.removed = bytearray(len(shape_ids))
+        self._set_columns_future(self.executor.submit(ShapesColumns.from_coords, coords_list))
+
+    def drop_removed(self) -> None:
+        """Drop removed shapes and renumber positions (e.g. after source is saved without removed shapes).
+           Already built columns are compressed instead of being rebuilt
+        """
+        selectors = list(map(not_, self.removed))
+        columns_future = self.columns_future
+        self.shape_ids = list(compress(self.shape_ids, selectors))
+        self.coords_list = list(compress(self.coords_list, selectors))
+        self.shape_positions = dict(zip(self.shape_ids, range(len(self.shape_ids))))
+        self.removed = bytearray(len(self.shape_ids))
+
+        if columns_future.done() and columns_future.exception() is None:
+            compressed_columns_future = Future()
+            compressed_columns_future.set_result(columns_future.result().compress(selectors))
+            self._set_columns_future(compressed_columns_future)
+        else:
+            self._set_columns_future(self.executor.submit(ShapesColumns.from_coords, self.coords_list))
+
+    def _set_columns_future(self, columns_future: Future) -> None:
+        if self.columns_future is not None:
+            # Outdated build is not needed if it has not started yet
+            self.columns_future.cancel()
+        self.columns_future = columns_future
+
+    def get_columns(self) -> ShapesColumns:
+        """Get columns, waiting for the build if it is not finished
+        """
+        return self.columns_future.result()
+
+    def get_visible_mask(self, shapes_filter: Optional[ShapesFilter]) -> bytearray:
+        """Evaluate filter criteria column by column and combine them into one mask.
+           Comparisons are chained as C-level map() iterators, so the columns are traversed in a single pass.
+
+        Args:
+            shapes_filter (Optional[ShapesFilter]): filter criteria, None to keep all not removed shapes
+
+        Returns:
+            bytearray: visibility flags aligned with shape_ids
+        """
+        mask = map(not_, self.removed)
+        if shapes_filter is None:
+            return bytearray(mask)
+
+        columns = self.get_columns()
+
+        if shapes_filter.shape_types is not None:
+            mask = map(and_, mask, map(shapes_filter.shape_types.__contains__, columns.shape_types))
+        if shapes_filter.min_vertices is not None:
+            mask = map(and_, mask, map(gt, columns.vertices, repeat(shapes_filter.min_vertices)))
+        if shapes_filter.min_length is not None:
+            mask = map(and_, mask, map(gt, columns.lengths, repeat(shapes_filter.min_length)))
+        if shapes_filter.bbox is not None:
+            bbox_x_min, bbox_y_min, bbox_x_max, bbox_y_max = shapes_filter.bbox
+            mask = map(and_, mask, map(ge, columns.x_min, repeat(bbox_x_min)))
+            mask = map(and_, mask, map(ge, columns.y_min, repeat(bbox_y_min)))
+            mask = map(and_, mask, map(le, columns.x_max, repeat(bbox_x_max)))
+            mask = map(and_, mask, map(le, columns.y_max, repeat(bbox_y_max)))
+
+        return bytearray(mask)
+
+    def remove_shape(self, shape_id: int) -> None:
+        self.removed[self.shape_positions[shape_id]] = True
+
+    def get_removed_positions(self) -> List[int]:
+        return list(compress(range(len(self.removed)), self.removed))
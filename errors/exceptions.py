@@ -16,3 +16,11 @@ class CoordsEntryValueError(Exception):
 
 class CoordsEntryUnevenError(Exception):
     msg = 'Не удалось считать значения координат в строке №{} (количество координат должно быть чётным).'
+
+
+class SessionSnapshotReadError(Exception):
+    msg = 'Не удалось восстановить сессию из файла "{}" (файл повреждён).'
+
+
+class SessionSnapshotWriteError(Exception):
+    msg = 'Не удалось сохранить сессию в файл "{}".'
@@ -1,4 +1,9 @@
-from typing import List
+from typing import List, Tuple
 
 
 ShapeCoords = List[float]
+# Bounding box in coordinates file units: x_min, y_min, x_max, y_max
+ShapeBBox = Tuple[float, float, float, float]
+# Map view transform matrix (row by row) and scene rect (x, y, width, height)
+ViewTransform = Tuple[float, float, float, float, float, float, float, float, float]
+ViewSceneRect = Tuple[float, float, float, float]
@@ -0,0 +1,18 @@
+import os
+from typing import Tuple
+
+
+def get_file_signature(file_path: str) -> Tuple[int, int]:
+    """Get file size and modification time (used to detect file changes)
+
+    Args:
+        file_path (str): path to file
+
+    Returns:
+        Tuple[int, int]: file size and modification time (ns), (-1, -1) if file is not accessible
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return -1, -1
+    return file_stat.st_size, file_stat.st_mtime_ns
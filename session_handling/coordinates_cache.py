@@ -0,0 +1,109 @@
+import gc
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain, repeat
+from operator import and_, ge, sub
+from typing import List
+
+from errors import exceptions
+from helpers.custom_types import ShapeCoords
+
+# Binary layout (little-endian): magic, version, source file size and mtime, source path length, shapes count,
+# coordinates count, then source path (utf-8), shapes' offsets in coordinates (uint64 each, shapes count + 1)
+# and coordinates (double each)
+COORDINATES_CACHE_MAGIC = b'AGCC'
+COORDINATES_CACHE_VERSION = 1
+COORDINATES_CACHE_HEADER = struct.Struct('<4sHQqIQQ')
+
+
+class CoordinatesCache:
+    """Parsed coordinates of a coordinates file, keyed by the file's path, size and modification time.
+       Lets session restore skip text parsing of unchanged file
+    """
+
+    def __init__(self, source_path: str, source_size: int, source_mtime_ns: int, coords_list: List[ShapeCoords]) -> None:
+        self.source_path = source_path
+        self.source_size = source_size
+        self.source_mtime_ns = source_mtime_ns
+        self.coords_list = coords_list
+
+    def is_cache_of(self, source_path: str, source_size: int, source_mtime_ns: int) -> bool:
+        return (self.source_path, self.source_size, self.source_mtime_ns) == (source_path, source_size, source_mtime_ns)
+
+    def to_bytes(self) -> bytes:
+        offsets = array('Q', accumulate(map(len, self.coords_list), initial=0))
+        coords = array('d', chain.from_iterable(self.coords_list))
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            coords.byteswap()
+
+        source_path_encoded = self.source_path.encode('utf-8')
+        header = COORDINATES_CACHE_HEADER.pack(
+            COORDINATES_CACHE_MAGIC,
+            COORDINATES_CACHE_VERSION,
+            self.source_size,
+            self.source_mtime_ns,
+            len(source_path_encoded),
+            len(self.coords_list),
+            len(coords),
+        )
+        return b''.join((header, source_path_encoded, offsets.tobytes(), coords.tobytes()))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CoordinatesCache':
+        """Unpack cache
+
+        Args:
+            data (bytes): packed cache
+
+        Raises:
+            exceptions.SessionSnapshotReadError: raised if data is malformed
+
+        Returns:
+            CoordinatesCache: unpacked cache
+        """
+        try:
+            (magic, version, source_size, source_mtime_ns,
+             source_path_length, shapes_count, coords_count) = COORDINATES_CACHE_HEADER.unpack_from(data)
+            offsets_start = COORDINATES_CACHE_HEADER.size + source_path_length
+            coords_start = offsets_start + (shapes_count + 1) * 8
+            if (magic != COORDINATES_CACHE_MAGIC or version != COORDINATES_CACHE_VERSION
+                    or len(data) != coords_start + coords_count * 8):
+                raise exceptions.SessionSnapshotReadError
+
+            source_path = data[COORDINATES_CACHE_HEADER.size:offsets_start].decode('utf-8')
+        except (struct.error, UnicodeDecodeError):
+            raise exceptions.SessionSnapshotReadError
+
+        offsets = array('Q')
+        offsets.frombytes(data[offsets_start:coords_start])
+        coords = array('d')
+        coords.frombytes(data[coords_start:])
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            coords.byteswap()
+        # Each shape has even (and not zero) coordinates count, so offsets strictly increase by even steps
+        shapes_lengths = list(map(sub, offsets[1:], offsets))
+        if (offsets[0] != 0 or offsets[-1] != coords_count
+                or not all(map(ge, shapes_lengths, repeat(2)))
+                or any(map(and_, shapes_lengths, repeat(1)))):
+            raise exceptions.SessionSnapshotReadError
+
+        coords_flat = coords.tolist()
+        # Creating millions of lists triggers cyclic garbage collection over and over (it dominates unpacking time),
+        # while these lists cannot form reference cycles. Caller's collector state is restored
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            coords_list = [coords_flat[start:end] for start, end in zip(offsets, offsets[1:])]
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        return cls(
+            source_path=source_path,
+            source_size=source_size,
+            source_mtime_ns=source_mtime_ns,
+            coords_list=coords_list,
+        )
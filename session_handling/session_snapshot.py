@@ -0,0 +1,221 @@
+import os
+import struct
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from errors.status_store import StatusStore
+from errors import exceptions
+from helpers.custom_types import ShapeCoords, ViewSceneRect, ViewTransform
+from helpers.file_signature import get_file_signature
+from session_handling.coordinates_cache import CoordinatesCache
+
+SESSION_SNAPSHOT_FILE_PATH = Path.home() / '.antereal_gis_session'
+
+# Binary layout (little-endian): magic, version, source file size and mtime, selected shape position,
+# view transform (3x3 matrix), view scene rect flag (is rect set) and rect (x, y, width, height),
+# source path length, removed positions count, then source path (utf-8) and removed positions (uint32 each)
+SESSION_SNAPSHOT_MAGIC = b'AGSS'
+SESSION_SNAPSHOT_VERSION = 2
+SESSION_SNAPSHOT_HEADER = struct.Struct('<4sHQqq9d?4dII')
+
+
+class SessionSnapshot:
+    """Edited session state: coordinates source reference, removed shapes, selection and map view.
+       Shapes are referenced by their positions in coordinates source. On restore coordinates are loaded
+       from CoordinatesCache (source is parsed only if there is no cache for it) and edits are applied in bulk.
+    """
+
+    def __init__(self,
+                 source_path: str,
+                 source_size: int,
+                 source_mtime_ns: int,
+                 removed_positions: List[int],
+                 selected_position: int,
+                 view_transform: ViewTransform,
+                 view_scene_rect: Optional[ViewSceneRect]) -> None:
+        self.source_path = source_path
+        self.source_size = source_size
+        self.source_mtime_ns = source_mtime_ns
+        self.removed_positions = removed_positions
+        self.selected_position = selected_position
+        self.view_transform = view_transform
+        self.view_scene_rect = view_scene_rect
+
+    def is_source_unchanged(self) -> bool:
+        return get_file_signature(self.source_path) == (self.source_size, self.source_mtime_ns)
+
+    def to_bytes(self) -> bytes:
+        source_path_encoded = self.source_path.encode('utf-8')
+        header = SESSION_SNAPSHOT_HEADER.pack(
+            SESSION_SNAPSHOT_MAGIC,
+            SESSION_SNAPSHOT_VERSION,
+            self.source_size,
+            self.source_mtime_ns,
+            self.selected_position,
+            *self.view_transform,
+            self.view_scene_rect is not None,
+            *(self.view_scene_rect or (0.0, 0.0, 0.0, 0.0)),
+            len(source_path_encoded),
+            len(self.removed_positions),
+        )
+        removed_positions_packed = struct.pack(f'<{len(self.removed_positions)}I', *self.removed_positions)
+        return header + source_path_encoded + removed_positions_packed
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SessionSnapshot':
+        """Unpack snapshot
+
+        Args:
+            data (bytes): packed snapshot
+
+        Raises:
+            exceptions.SessionSnapshotReadError: raised if data is malformed
+
+        Returns:
+            SessionSnapshot: unpacked snapshot
+        """
+        try:
+            (magic, version, source_size, source_mtime_ns, selected_position,
+             *view_transform, view_scene_rect_is_set, view_scene_rect_x, view_scene_rect_y,
+             view_scene_rect_width, view_scene_rect_height,
+             source_path_length, removed_count) = SESSION_SNAPSHOT_HEADER.unpack_from(data)
+            offset = SESSION_SNAPSHOT_HEADER.size
+            if (magic != SESSION_SNAPSHOT_MAGIC or version != SESSION_SNAPSHOT_VERSION
+                    or len(data) != offset + source_path_length + removed_count * 4):
+                raise exceptions.SessionSnapshotReadError
+
+            source_path = data[offset:offset + source_path_length].decode('utf-8')
+            offset += source_path_length
+            removed_positions = list(struct.unpack_from(f'<{removed_count}I', data, offset))
+        except (struct.error, UnicodeDecodeError):
+            raise exceptions.SessionSnapshotReadError
+
+        return cls(
+            source_path=source_path,
+            source_size=source_size,
+            source_mtime_ns=source_mtime_ns,
+            removed_positions=removed_positions,
+            selected_position=selected_position,
+            view_transform=tuple(view_transform),
+            view_scene_rect=(
+                (view_scene_rect_x, view_scene_rect_y, view_scene_rect_width, view_scene_rect_height)
+                if view_scene_rect_is_set else None
+            ),
+        )
+
+
+class SessionSnapshotStore:
+    """Session snapshot file r/w. Writing is done in a background thread, unchanged snapshots are not rewritten.
+       Write results are collected on the caller's (main) thread, the worker does not touch store state
+    """
+
+    def __init__(self, status_store: StatusStore, file_path: Path = SESSION_SNAPSHOT_FILE_PATH) -> None:
+        self.status_store = status_store
+        self.file_path = file_path
+        self.coordinates_cache_file_path = file_path.with_name(file_path.name + '.coords')
+        self.last_saved_data: Optional[bytes] = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_writes: List[Tuple[Future, Path]] = []
+
+    def save_in_background(self, snapshot: SessionSnapshot) -> None:
+        data = snapshot.to_bytes()
+        if data == self.last_saved_data:
+            return
+        self.last_saved_data = data
+        self.pending_writes.append((self.executor.submit(self._write, self.file_path, data), self.file_path))
+
+    def save_coordinates_cache_in_background(self, coordinates_cache: CoordinatesCache) -> None:
+        """Save parsed coordinates in background (packing is done in background too,
+           coords lists are not modified after parsing)
+        """
+        file_path = self.coordinates_cache_file_path
+        future = self.executor.submit(lambda: self._write(file_path, coordinates_cache.to_bytes()))
+        self.pending_writes.append((future, file_path))
+
+    @staticmethod
+    def _write(file_path: Path, data: bytes) -> None:
+        """Write data through temporary file, so restore never reads a partially written file
+
+        Raises:
+            OSError: raised if file is not writable
+        """
+        temporary_file_path = file_path.with_name(file_path.name + '.tmp')
+        with open(temporary_file_path, mode='wb') as snapshot_file:
+            snapshot_file.write(data)
+        os.replace(temporary_file_path, file_path)
+
+    def collect_write_errors(self) -> List[str]:
+        """Check finished background writes, add statuses for failed ones
+
+        Returns:
+            List[str]: failed writes' statuses
+        """
+        statuses = []
+        pending_writes = []
+        for future, file_path in self.pending_writes:
+            if not future.done():
+                pending_writes.append((future, file_path))
+            elif future.exception() is not None:
+                statuses.append(exceptions.SessionSnapshotWriteError.msg.format(file_path))
+                if file_path == self.file_path:
+                    # Rewrite snapshot on next save even if it is unchanged
+                    self.last_saved_data = None
+        self.pending_writes = pending_writes
+
+        for status in statuses:
+            self.status_store.add_status(status)
+        return statuses
+
+    def load(self) -> Optional[SessionSnapshot]:
+        """Load snapshot from file
+
+        Returns:
+            Optional[SessionSnapshot]: snapshot, None if there is no snapshot or it is malformed
+        """
+        try:
+            with open(self.file_path, mode='rb') as snapshot_file:
+                data = snapshot_file.read()
+        except OSError:
+            return None
+
+        try:
+            snapshot = SessionSnapshot.from_bytes(data)
+        except exceptions.SessionSnapshotReadError as exception:
+            self.status_store.add_status(exception.msg.format(self.file_path))
+            return None
+
+        self.last_saved_data = data
+        return snapshot
+
+    def load_coordinates_cache(self, source_path: str, source_size: int, source_mtime_ns: int) -> Optional[List[ShapeCoords]]:
+        """Load parsed coordinates of specified coordinates file
+
+        Args:
+            source_path (str): path to coordinates file
+            source_size (int): coordinates file size
+            source_mtime_ns (int): coordinates file modification time (ns)
+
+        Returns:
+            Optional[List[ShapeCoords]]: list of ShapeCoords, None if there is no cache for the file in its current state
+        """
+        try:
+            with open(self.coordinates_cache_file_path, mode='rb') as coordinates_cache_file:
+                data = coordinates_cache_file.read()
+        except OSError:
+            return None
+
+        try:
+            coordinates_cache = CoordinatesCache.from_bytes(data)
+        except exceptions.SessionSnapshotReadError as exception:
+            self.status_store.add_status(exception.msg.format(self.coordinates_cache_file_path))
+            return None
+
+        if not coordinates_cache.is_cache_of(source_path, source_size, source_mtime_ns):
+            return None
+        return coordinates_cache.coords_list
+
+    def shutdown(self) -> None:
+        """Wait for pending writes
+        """
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,135 @@
+from itertools import compress
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from coordinates_handling.coordinates_handling import CoordinatesHandler  # noqa: E402
+from coordinates_handling.shapes_filter import ShapesFilter, ShapeType  # noqa: E402
+from errors.status_store import StatusStore  # noqa: E402
+from helpers.file_signature import get_file_signature  # noqa: E402
+from session_handling.session_snapshot import SessionSnapshot  # noqa: E402
+
+COORDS_LIST = [
+    [1.0, 1.0],
+    [0.0, 0.0, 3.0, 4.0],
+    [0.0, 0.0, 30.0, 40.0],
+    [0.0, 0.0, 3.0, 0.0, 3.0, 4.0],
+]
+
+
+def make_handler() -> CoordinatesHandler:
+    handler = CoordinatesHandler(status_store=StatusStore())
+    handler.translate_coords_to_shapes(coords_list=[list(coords) for coords in COORDS_LIST])
+    return handler
+
+
+def visible_coords(handler: CoordinatesHandler, visible_mask: bytearray):
+    return [handler.shapes_map[shape_id].coords for shape_id in compress(handler.get_shape_ids(), visible_mask)]
+
+
+def test_filter_is_reset_on_translate():
+    handler = make_handler()
+    handler.set_shapes_filter(ShapesFilter(shape_types=[ShapeType.DOT]))
+    handler.translate_coords_to_shapes(coords_list=[list(coords) for coords in COORDS_LIST])
+    assert handler.shapes_filter is None
+    assert handler.get_visible_mask() == bytearray([1, 1, 1, 1])
+
+
+def test_removed_shape_is_never_visible():
+    handler = make_handler()
+    removed_shape_id = handler.get_shape_ids()[1]
+    handler.remove_shape(id=removed_shape_id)
+    assert handler.get_visible_mask() == bytearray([1, 0, 1, 1])
+    assert handler.set_shapes_filter(ShapesFilter(shape_types=[ShapeType.LINE])) == bytearray([0, 0, 1, 0])
+
+
+def test_index_is_renumbered_after_save_with_active_filter(tmp_path):
+    saved_file_path = tmp_path / 'saved.txt'
+    saved_file_path.write_text('')
+    handler = make_handler()
+    handler.set_shapes_filter(ShapesFilter(shape_types=[ShapeType.LINE]))
+    handler.remove_shape(id=handler.get_shape_ids()[1])
+
+    assert handler.save_coords(file_path=str(saved_file_path))
+    assert len(handler.get_shape_ids()) == 3
+    visible_mask = handler.get_visible_mask()
+    assert visible_mask == bytearray([0, 1, 0])
+    assert visible_coords(handler, visible_mask) == [COORDS_LIST[2]]
+
+
+def make_snapshot(handler: CoordinatesHandler) -> SessionSnapshot:
+    source_size, source_mtime_ns = handler.get_source_signature()
+    return SessionSnapshot(
+        source_path=handler.get_source_file_path(),
+        source_size=source_size,
+        source_mtime_ns=source_mtime_ns,
+        removed_positions=handler.get_removed_positions(),
+        selected_position=-1,
+        view_transform=(1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0),
+        view_scene_rect=None,
+    )
+
+
+def test_snapshot_keeps_parse_time_signature_after_external_edit(tmp_path):
+    source_file_path = tmp_path / 'coords.txt'
+    source_file_path.write_text('1 1\n0 0 3 4\n')
+    handler = CoordinatesHandler(status_store=StatusStore())
+    handler.retrieve_coords(file_path=str(source_file_path))
+    parse_time_signature = get_file_signature(str(source_file_path))
+    handler.remove_shape(id=handler.get_shape_ids()[0])
+    assert make_snapshot(handler).is_source_unchanged()
+
+    # File edited outside the app: positions no longer refer to it, snapshot must not pass as unchanged
+    source_file_path.write_text('0 0 3 4\n5 5\n7 7\n')
+    assert handler.get_source_signature() == parse_time_signature
+    assert not make_snapshot(handler).is_source_unchanged()
+
+
+def test_remove_shapes_by_positions():
+    handler = make_handler()
+    shape_ids = handler.get_shape_ids()
+    handler.remove_shape(id=shape_ids[3])
+
+    # Out of range and already removed positions are ignored
+    handler.remove_shapes_by_positions(positions=[1, 3, 4, 100, -1])
+    assert handler.get_removed_positions() == [1, 3]
+    assert [shape.coords for shape in handler.get_shapes()] == [COORDS_LIST[0], COORDS_LIST[2]]
+
+
+def test_get_shape_by_position():
+    handler = make_handler()
+    handler.remove_shape(id=handler.get_shape_ids()[1])
+    assert handler.get_shape_by_position(position=0).coords == COORDS_LIST[0]
+    assert handler.get_shape_by_position(position=1) is None
+    assert handler.get_shape_by_position(position=4) is None
+    assert handler.get_shape_by_position(position=-1) is None
+    assert handler.get_shape_position(handler.get_shape_by_position(position=2)) == 2
+    assert handler.get_shape_position(None) == -1
+
+
+@pytest.mark.parametrize('save_to_source', [True, False])
+def test_save_renumbers_positions_and_switches_source(tmp_path, save_to_source: bool):
+    source_file_path = tmp_path / 'source.txt'
+    source_file_path.write_text(''.join(' '.join(map(str, coords)) + '\n' for coords in COORDS_LIST))
+    saved_file_path = source_file_path if save_to_source else tmp_path / 'saved.txt'
+    saved_file_path.touch()
+    handler = CoordinatesHandler(status_store=StatusStore())
+    handler.retrieve_coords(file_path=str(source_file_path))
+    kept_shape = handler.get_shape_by_position(position=2)
+    handler.remove_shapes_by_positions(positions=[0, 1])
+
+    assert handler.save_coords(file_path=str(saved_file_path))
+    assert handler.get_source_file_path() == str(saved_file_path)
+    assert handler.get_source_signature() == get_file_signature(str(saved_file_path))
+    assert handler.get_removed_positions() == []
+    assert handler.get_shape_position(kept_shape) == 0
+    assert handler.get_source_coords() == COORDS_LIST[2:]
+
+
+def test_failed_save_keeps_source_and_positions(tmp_path):
+    handler = make_handler()
+    handler.remove_shape(id=handler.get_shape_ids()[0])
+    assert not handler.save_coords(file_path=str(tmp_path / 'missing.txt'))
+    assert handler.get_source_file_path() == ''
+    assert handler.get_removed_positions() == [0]
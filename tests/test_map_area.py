@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from ui.areas.map import MapArea  # noqa: E402
+
+
+class FakeItem:
+    def __init__(self, shape_id: int) -> None:
+        self.shape_id = shape_id
+        self.visible_calls = []
+
+    def setVisible(self, visible: bool) -> None:
+        self.visible_calls.append(visible)
+
+    def data(self, key: int) -> int:
+        return self.shape_id
+
+
+class FakeScene:
+    def __init__(self) -> None:
+        self.removed_items = []
+
+    def removeItem(self, item: FakeItem) -> None:
+        self.removed_items.append(item)
+
+
+class FakeShape:
+    pass
+
+
+def make_map_area(shapes):
+    """MapArea with rendered items stubbed (no QApplication is needed)
+    """
+    map_area = MapArea.__new__(MapArea)
+    map_area.map_frame = FakeScene()
+    map_area.map_rendered_shapes = {}
+    map_area.map_rendered_items = {}
+    map_area.map_focused_item = None
+    for shape in shapes:
+        item = FakeItem(shape_id=id(shape))
+        map_area.map_rendered_shapes[id(shape)] = shape
+        map_area.map_rendered_items[id(shape)] = item
+    map_area.map_visibility_shape_ids = None
+    map_area.map_visibility_mask = bytearray()
+    map_area.map_visibility_items = None
+    return map_area
+
+
+def get_visible_calls(map_area, shapes):
+    return [map_area.map_rendered_items[id(shape)].visible_calls for shape in shapes]
+
+
+def test_only_changed_items_are_updated():
+    shapes = [FakeShape() for _ in range(4)]
+    shape_ids = [id(shape) for shape in shapes]
+    map_area = make_map_area(shapes)
+
+    map_area.update_visible_shapes(shape_ids, bytearray([1, 0, 1, 0]))
+    assert get_visible_calls(map_area, shapes) == [[], [False], [], [False]]
+
+    map_area.update_visible_shapes(shape_ids, bytearray([0, 1, 1, 0]))
+    assert get_visible_calls(map_area, shapes) == [[False], [False, True], [], [False]]
+
+    map_area.update_visible_shapes(shape_ids, bytearray([0, 1, 1, 0]))
+    assert get_visible_calls(map_area, shapes) == [[False], [False, True], [], [False]]
+
+
+def test_removed_item_is_not_updated():
+    shapes = [FakeShape() for _ in range(3)]
+    shape_ids = [id(shape) for shape in shapes]
+    map_area = make_map_area(shapes)
+    map_area.update_visible_shapes(shape_ids, bytearray([1, 1, 1]))
+
+    removed_item = map_area.map_rendered_items[shape_ids[1]]
+    map_area.map_focused_item = removed_item
+    map_area.remove_focused_item()
+    assert map_area.map_frame.removed_items == [removed_item]
+
+    # Removed shape keeps its position in shape ids, but is hidden by mask
+    map_area.update_visible_shapes(shape_ids, bytearray([0, 0, 1]))
+    assert removed_item.visible_calls == []
+    assert map_area.map_rendered_items[shape_ids[0]].visible_calls == [False]
+
+
+def test_visibility_is_realigned_with_new_shape_ids():
+    shapes = [FakeShape() for _ in range(3)]
+    map_area = make_map_area(shapes)
+    map_area.update_visible_shapes([id(shape) for shape in shapes], bytearray([1, 0, 1]))
+
+    # Positions renumbered (e.g. after saving without the first shape)
+    renumbered_shape_ids = [id(shapes[1]), id(shapes[2])]
+    map_area.update_visible_shapes(renumbered_shape_ids, bytearray([1, 1]))
+    assert get_visible_calls(map_area, shapes) == [[], [False, True], []]
@@ -0,0 +1,166 @@
+import gc
+import struct
+from pathlib import Path
+
+import pytest
+
+from errors import exceptions
+from errors.status_store import StatusStore
+from session_handling.coordinates_cache import COORDINATES_CACHE_HEADER, CoordinatesCache
+from session_handling.session_snapshot import SESSION_SNAPSHOT_HEADER, SessionSnapshot, SessionSnapshotStore
+
+VIEW_TRANSFORM = (1.25, 0.0, 0.0, 0.0, 1.25, 0.0, -10.5, 20.0, 1.0)
+
+
+def make_snapshot(**kwargs) -> SessionSnapshot:
+    snapshot_kwargs = dict(
+        source_path='/tmp/coords.txt',
+        source_size=212,
+        source_mtime_ns=1661130841000000000,
+        removed_positions=[0, 3, 4_000_000_000],
+        selected_position=2,
+        view_transform=VIEW_TRANSFORM,
+        view_scene_rect=(-5.0, -250.5, 640.0, 480.0),
+    )
+    snapshot_kwargs.update(kwargs)
+    return SessionSnapshot(**snapshot_kwargs)
+
+
+@pytest.mark.parametrize('snapshot', [
+    make_snapshot(),
+    make_snapshot(removed_positions=[], selected_position=-1, view_scene_rect=None),
+    make_snapshot(source_path='/home/пользователь/координаты.txt'),
+])
+def test_snapshot_round_trip(snapshot: SessionSnapshot):
+    restored = SessionSnapshot.from_bytes(snapshot.to_bytes())
+    assert vars(restored) == vars(snapshot)
+
+
+def test_snapshot_bad_magic():
+    data = make_snapshot().to_bytes()
+    with pytest.raises(exceptions.SessionSnapshotReadError):
+        SessionSnapshot.from_bytes(b'XXXX' + data[4:])
+
+
+def test_snapshot_bad_version():
+    data = make_snapshot().to_bytes()
+    with pytest.raises(exceptions.SessionSnapshotReadError):
+        SessionSnapshot.from_bytes(data[:4] + struct.pack('<H', 999) + data[6:])
+
+
+@pytest.mark.parametrize('length', [0, 10, SESSION_SNAPSHOT_HEADER.size, SESSION_SNAPSHOT_HEADER.size + 3, -1])
+def test_snapshot_truncated(length: int):
+    data = make_snapshot().to_bytes()
+    with pytest.raises(exceptions.SessionSnapshotReadError):
+        SessionSnapshot.from_bytes(data[:length])
+
+
+@pytest.mark.parametrize('coords_list', [
+    [],
+    [[1.0, 2.0], [0.0, 0.0, 3.5, -4.25], [0.0, 0.0, 1.0, 0.0, 1.0, 1.0, 0.0, 1.0]],
+])
+def test_coordinates_cache_round_trip(coords_list):
+    cache = CoordinatesCache(source_path='/tmp/координаты.txt', source_size=10, source_mtime_ns=20,
+                             coords_list=coords_list)
+    restored = CoordinatesCache.from_bytes(cache.to_bytes())
+    assert vars(restored) == vars(cache)
+    assert restored.is_cache_of('/tmp/координаты.txt', 10, 20)
+    assert not restored.is_cache_of('/tmp/координаты.txt', 10, 21)
+
+
+def test_coordinates_cache_truncated():
+    data = CoordinatesCache(source_path='a', source_size=1, source_mtime_ns=1, coords_list=[[1.0, 2.0]]).to_bytes()
+    for length in (0, len(data) - 8, len(data) - 1):
+        with pytest.raises(exceptions.SessionSnapshotReadError):
+            CoordinatesCache.from_bytes(data[:length])
+
+
+def corrupt_offsets(data: bytes, offsets) -> bytes:
+    """Replace packed offsets of cache made by make_cache_data
+    """
+    offsets_start = COORDINATES_CACHE_HEADER.size + 1
+    offsets_packed = struct.pack(f'<{len(offsets)}Q', *offsets)
+    return data[:offsets_start] + offsets_packed + data[offsets_start + len(offsets_packed):]
+
+
+def make_cache_data() -> bytes:
+    coords_list = [[1.0, 2.0], [0.0, 0.0, 3.0, 4.0], [0.0, 0.0, 1.0, 0.0, 1.0, 1.0]]
+    return CoordinatesCache(source_path='a', source_size=1, source_mtime_ns=1, coords_list=coords_list).to_bytes()
+
+
+@pytest.mark.parametrize('offsets', [
+    [0, 6, 2, 12],   # decreasing
+    [0, 2, 2, 12],   # empty shape
+    [0, 3, 6, 12],   # odd shape length
+    [0, 2, 6, 11],   # last offset does not match coordinates count
+])
+def test_coordinates_cache_bad_offsets(offsets):
+    with pytest.raises(exceptions.SessionSnapshotReadError):
+        CoordinatesCache.from_bytes(corrupt_offsets(make_cache_data(), offsets))
+
+
+@pytest.mark.parametrize('gc_enabled', [True, False])
+def test_coordinates_cache_keeps_gc_state(gc_enabled: bool):
+    gc_was_enabled = gc.isenabled()
+    try:
+        gc.enable() if gc_enabled else gc.disable()
+        CoordinatesCache.from_bytes(make_cache_data())
+        assert gc.isenabled() == gc_enabled
+    finally:
+        gc.enable() if gc_was_enabled else gc.disable()
+
+
+def make_store(file_path: Path) -> SessionSnapshotStore:
+    return SessionSnapshotStore(status_store=StatusStore(), file_path=file_path)
+
+
+def wait_for_writes(store: SessionSnapshotStore) -> None:
+    for future, _ in store.pending_writes:
+        future.exception()
+
+
+def test_store_skips_unchanged_snapshot(tmp_path):
+    store = make_store(tmp_path / 'session')
+    store.save_in_background(make_snapshot())
+    store.save_in_background(make_snapshot())
+    assert len(store.pending_writes) == 1
+    store.save_in_background(make_snapshot(selected_position=3))
+    assert len(store.pending_writes) == 2
+
+    wait_for_writes(store)
+    assert store.collect_write_errors() == []
+    assert store.pending_writes == []
+    assert vars(make_store(tmp_path / 'session').load()) == vars(make_snapshot(selected_position=3))
+
+
+def test_store_rewrites_snapshot_after_failed_write(tmp_path):
+    store = make_store(tmp_path / 'missing_directory' / 'session')
+    store.save_in_background(make_snapshot())
+    wait_for_writes(store)
+
+    statuses = store.collect_write_errors()
+    assert statuses == [exceptions.SessionSnapshotWriteError.msg.format(store.file_path)]
+    assert store.status_store.get_statuses_list() == statuses
+    assert store.last_saved_data is None
+
+    (tmp_path / 'missing_directory').mkdir()
+    store.save_in_background(make_snapshot())
+    wait_for_writes(store)
+    assert store.collect_write_errors() == []
+    assert make_store(store.file_path).load() is not None
+
+
+def test_store_loads_coordinates_cache_by_source_key(tmp_path):
+    coords_list = [[1.0, 2.0], [0.0, 0.0, 3.0, 4.0]]
+    store = make_store(tmp_path / 'session')
+    assert store.load_coordinates_cache(source_path='a.txt', source_size=10, source_mtime_ns=20) is None
+
+    store.save_coordinates_cache_in_background(
+        CoordinatesCache(source_path='a.txt', source_size=10, source_mtime_ns=20, coords_list=coords_list))
+    wait_for_writes(store)
+    assert store.collect_write_errors() == []
+
+    assert store.load_coordinates_cache(source_path='a.txt', source_size=10, source_mtime_ns=20) == coords_list
+    assert store.load_coordinates_cache(source_path='a.txt', source_size=11, source_mtime_ns=20) is None
+    assert store.load_coordinates_cache(source_path='a.txt', source_size=10, source_mtime_ns=21) is None
+    assert store.load_coordinates_cache(source_path='b.txt', source_size=10, source_mtime_ns=20) is None
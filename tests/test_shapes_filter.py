@@ -0,0 +1,103 @@
+from itertools import compress
+from math import isclose
+from typing import Optional, Set
+
+from coordinates_handling.shapes_filter import CoordinatesShapesIndex, ShapesFilter, ShapeType
+
+DOT = [1.0, 1.0]
+SHORT_LINE = [0.0, 0.0, 3.0, 4.0]
+LONG_LINE = [0.0, 0.0, 30.0, 40.0]
+TRIANGLE = [0.0, 0.0, 3.0, 0.0, 3.0, 4.0]
+FAR_SQUARE = [100.0, 100.0, 110.0, 100.0, 110.0, 110.0, 100.0, 110.0]
+
+
+def make_index() -> CoordinatesShapesIndex:
+    index = CoordinatesShapesIndex()
+    index.reset(shape_ids=[10, 11, 12, 13, 14], coords_list=[DOT, SHORT_LINE, LONG_LINE, TRIANGLE, FAR_SQUARE])
+    return index
+
+
+def visible_ids(index: CoordinatesShapesIndex, shapes_filter: Optional[ShapesFilter]) -> Set[int]:
+    return set(compress(index.shape_ids, index.get_visible_mask(shapes_filter=shapes_filter)))
+
+
+def test_no_filter_keeps_not_removed_shapes():
+    index = make_index()
+    index.remove_shape(shape_id=11)
+    assert index.get_visible_mask(shapes_filter=None) == bytearray([1, 0, 1, 1, 1])
+
+
+def test_no_criteria_keeps_all_shapes():
+    assert visible_ids(make_index(), ShapesFilter()) == {10, 11, 12, 13, 14}
+
+
+def test_shape_types():
+    index = make_index()
+    assert visible_ids(index, ShapesFilter(shape_types=[ShapeType.DOT])) == {10}
+    assert visible_ids(index, ShapesFilter(shape_types=[ShapeType.LINE])) == {11, 12}
+    assert visible_ids(index, ShapesFilter(shape_types=[ShapeType.POLYGON, ShapeType.DOT])) == {10, 13, 14}
+
+
+def test_min_vertices_is_strict():
+    index = make_index()
+    assert visible_ids(index, ShapesFilter(min_vertices=3)) == {14}
+    assert visible_ids(index, ShapesFilter(min_vertices=2)) == {13, 14}
+
+
+def test_bbox_keeps_shapes_entirely_inside():
+    index = make_index()
+    assert visible_ids(index, ShapesFilter(bbox=(0.0, 0.0, 5.0, 5.0))) == {10, 11, 13}
+    assert visible_ids(index, ShapesFilter(bbox=(100.0, 100.0, 110.0, 110.0))) == {14}
+
+
+def test_min_length():
+    index = make_index()
+    assert visible_ids(index, ShapesFilter(min_length=5.0)) == {12, 13, 14}
+    assert visible_ids(index, ShapesFilter(min_length=40.0)) == {12}
+
+
+def test_polygon_perimeter_includes_closing_edge():
+    index = make_index()
+    lengths = index.get_columns().lengths
+    assert isclose(lengths[3], 3.0 + 4.0 + 5.0)
+    assert isclose(lengths[4], 40.0)
+    # 3 + 4 + 5 triangle is longer than 11 only with its closing edge counted
+    assert 13 in visible_ids(index, ShapesFilter(min_length=11.0))
+
+
+def test_criteria_are_combined():
+    shapes_filter = ShapesFilter(shape_types=[ShapeType.LINE, ShapeType.POLYGON], bbox=(0.0, 0.0, 50.0, 50.0),
+                                 min_length=5.0)
+    assert visible_ids(make_index(), shapes_filter) == {12, 13}
+
+
+def test_removed_shapes_are_excluded():
+    index = make_index()
+    index.remove_shape(shape_id=12)
+    index.remove_shape(shape_id=10)
+    assert visible_ids(index, ShapesFilter()) == {11, 13, 14}
+    assert visible_ids(index, ShapesFilter(shape_types=[ShapeType.LINE])) == {11}
+    assert index.get_removed_positions() == [0, 2]
+
+
+def test_columns():
+    columns = make_index().get_columns()
+    assert columns.shape_types == [ShapeType.DOT, ShapeType.LINE, ShapeType.LINE, ShapeType.POLYGON, ShapeType.POLYGON]
+    assert list(columns.vertices) == [1, 2, 2, 3, 4]
+    assert list(columns.x_min) == [1.0, 0.0, 0.0, 0.0, 100.0]
+    assert list(columns.y_max) == [1.0, 4.0, 40.0, 4.0, 110.0]
+    assert [round(length, 6) for length in columns.lengths] == [0.0, 5.0, 50.0, 12.0, 40.0]
+
+
+def test_drop_removed_renumbers_positions_and_keeps_columns():
+    index = make_index()
+    index.get_columns()
+    index.remove_shape(shape_id=11)
+    index.remove_shape(shape_id=13)
+    index.drop_removed()
+    assert index.shape_ids == [10, 12, 14]
+    assert index.shape_positions == {10: 0, 12: 1, 14: 2}
+    assert index.coords_list == [DOT, LONG_LINE, FAR_SQUARE]
+    assert index.get_removed_positions() == []
+    assert list(index.get_columns().vertices) == [1, 2, 4]
+    assert visible_ids(index, ShapesFilter(shape_types=[ShapeType.LINE])) == {12}
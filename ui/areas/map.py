@@ -1,13 +1,16 @@
-from typing import List
+from itertools import compress
+from operator import ne
+from typing import Dict, List, Optional, Tuple
 
 from PyQt5.QtWidgets import (
     QGraphicsView,
     QGraphicsScene,
     QGraphicsItem,
 )
-from PyQt5.QtCore import Qt, QPointF, pyqtSignal
+from PyQt5.QtCore import Qt, QPointF, QRectF, pyqtSignal
 from PyQt5 import QtGui
 
+from helpers.custom_types import ViewSceneRect, ViewTransform
 from map_rendering.shapes import QGraphicsSceneShape
 
 MAP_ZOOM_RATIO = 1.25
@@ -18,6 +21,8 @@ DEFAULT_PEN_WIDTH = 1
 
 class DraggableQGraphicsView(QGraphicsView):
     old_cursor_position = None
+    # Scene rect is fixed once the map is dragged, before that view follows the scene's bounding rect
+    scene_rect_is_set = False
 
     def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
         if event.button() == Qt.LeftButton:
@@ -38,7 +43,16 @@ class DraggableQGraphicsView(QGraphicsView):
         map_transform = self.transform()
         dx = position.x() / map_transform.m11()
         dy = position.y() / map_transform.m22()
-        self.setSceneRect(self.sceneRect().translated(dx, dy))
+        self.set_scene_rect(self.sceneRect().translated(dx, dy))
+
+    def set_scene_rect(self, rect: Optional[QRectF]):
+        """Fix scene rect or (if None) let view follow the scene's bounding rect again
+
+        Args:
+            rect (Optional[QRectF]): scene rect
+        """
+        self.scene_rect_is_set = rect is not None
+        self.setSceneRect(QRectF() if rect is None else rect)
 
     def keyPressEvent(self, event: QtGui.QKeyEvent) -> None:
         if event.key() == Qt.Key_Delete:
@@ -71,6 +85,13 @@ class MapArea():
         self.map_frame.itemIndexMethod()
         self.map_frame.focusItemChanged.connect(self.highlight_focus_item)
         self.map_rendered_shapes = {}
+        # Rendered items by shape id, used to toggle visibility without re-rendering
+        self.map_rendered_items: Dict[int, QGraphicsItem] = {}
+        # Current visibility flags and shape ids list they are aligned with (None: all rendered shapes are visible),
+        # rendered items aligned with the same list are cached
+        self.map_visibility_shape_ids: Optional[List[int]] = None
+        self.map_visibility_mask = bytearray()
+        self.map_visibility_items: Optional[List[Optional[QGraphicsItem]]] = None
         self.map_focused_item: QGraphicsItem = None
 
         self.map_widget = DraggableQGraphicsView()
@@ -83,8 +104,41 @@ class MapArea():
         return self.map_focused_item
 
     def get_focused_shape(self) -> QGraphicsSceneShape:
+        if self.get_focused_item() is None:
+            return None
         return self.map_rendered_shapes.get(self.get_focused_item().data(0))
 
+    def focus_shape(self, shape: QGraphicsSceneShape) -> None:
+        item = self.map_rendered_items.get(id(shape))
+        if item is not None:
+            item.setFocus()
+
+    def get_view_state(self) -> Tuple[ViewTransform, Optional[ViewSceneRect]]:
+        """Get map view transform matrix and scene rect
+
+        Returns:
+            Tuple[ViewTransform, Optional[ViewSceneRect]]: transform matrix (row by row) and scene rect
+                (x, y, width, height), None if scene rect was not set by dragging the map
+        """
+        view_transform = self.map_widget.transform()
+        view_scene_rect = None
+        if self.map_widget.scene_rect_is_set:
+            scene_rect = self.map_widget.sceneRect()
+            view_scene_rect = (scene_rect.x(), scene_rect.y(), scene_rect.width(), scene_rect.height())
+        return (
+            (view_transform.m11(), view_transform.m12(), view_transform.m13(),
+             view_transform.m21(), view_transform.m22(), view_transform.m23(),
+             view_transform.m31(), view_transform.m32(), view_transform.m33()),
+            view_scene_rect,
+        )
+
+    def set_view_state(self, view_transform: ViewTransform, view_scene_rect: Optional[ViewSceneRect]) -> None:
+        self.map_widget.setTransform(QtGui.QTransform(*view_transform))
+        self.map_widget.set_scene_rect(None if view_scene_rect is None else QRectF(*view_scene_rect))
+
+    def reset_view_scene_rect(self) -> None:
+        self.map_widget.set_scene_rect(None)
+
     def highlight_focus_item(self, newFocusItem: QGraphicsItem, oldFocusItem: QGraphicsItem, reason: Qt.FocusReason):
         """Highlight focus item: set new map_focused_item (for later use) change fill color to lighter (if any)
            and set pen wider. Lost focus item' s fill color and pen width are set to default.
@@ -115,8 +169,16 @@ class MapArea():
         """
         self.map_frame.clear()
         self.map_rendered_shapes = {}
+        self.map_rendered_items = {}
+        self.map_visibility_shape_ids = None
+        self.map_visibility_mask = bytearray()
+        self.map_visibility_items = None
 
     def remove_focused_item(self):
+        shape_id = id(self.get_focused_shape())
+        self.map_rendered_items.pop(shape_id, None)
+        # Cached items list would keep removed item
+        self.map_visibility_items = None
         self.map_frame.removeItem(self.get_focused_item())
 
     def render_shapes(self, shapes: List[QGraphicsSceneShape]) -> None:
@@ -130,3 +192,43 @@ class MapArea():
         for shape in shapes:
             rendered_shape = shape.render(map_frame=self.map_frame)
             self.map_rendered_shapes[rendered_shape.data(0)] = shape
+            self.map_rendered_items[id(shape)] = rendered_shape
+
+    def update_visible_shapes(self, shape_ids: List[int], visible_mask: bytearray) -> None:
+        """Show only specified rendered shapes: only shapes whose visibility flag differs from the current one
+           are hidden or shown, the scene is not re-rendered
+
+        Args:
+            shape_ids (List[int]): shapes' ids
+            visible_mask (bytearray): visibility flags aligned with shape_ids
+        """
+        if shape_ids is not self.map_visibility_shape_ids:
+            self.map_visibility_mask = self._get_visibility_mask(shape_ids=shape_ids)
+            self.map_visibility_shape_ids = shape_ids
+            self.map_visibility_items = None
+        if self.map_visibility_items is None:
+            self.map_visibility_items = list(map(self.map_rendered_items.get, shape_ids))
+
+        items = self.map_visibility_items
+        changed_positions = compress(range(len(shape_ids)), map(ne, self.map_visibility_mask, visible_mask))
+        for position in changed_positions:
+            item = items[position]
+            # Removed shapes have no rendered item
+            if item is not None:
+                item.setVisible(bool(visible_mask[position]))
+
+        self.map_visibility_mask = visible_mask
+
+    def _get_visibility_mask(self, shape_ids: List[int]) -> bytearray:
+        """Get current visibility flags aligned with another shape ids list (e.g. after positions are renumbered)
+
+        Args:
+            shape_ids (List[int]): shapes' ids
+
+        Returns:
+            bytearray: visibility flags aligned with shape_ids
+        """
+        if self.map_visibility_shape_ids is None:
+            return bytearray(map(self.map_rendered_items.__contains__, shape_ids))
+        visible_shape_ids = set(compress(self.map_visibility_shape_ids, self.map_visibility_mask))
+        return bytearray(map(visible_shape_ids.__contains__, shape_ids))
@@ -4,10 +4,12 @@ from PyQt5.QtWidgets import (
     QShortcut,
 )
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtGui import QKeySequence
+from PyQt5.QtGui import QCloseEvent, QKeySequence
 
 from coordinates_handling.coordinates_handling import CoordinatesHandler
 from errors.status_store import StatusStore
+from session_handling.coordinates_cache import CoordinatesCache
+from session_handling.session_snapshot import SessionSnapshot, SessionSnapshotStore
 from ui.areas import FileBrowseArea, MapArea, StatusArea
 
 MANUAL_FILEPATH_INPUT_PARSING_DELAY_MS = 1000
@@ -17,6 +19,8 @@ MAIN_WINDOW_MIN_HEIGHT = 480
 
 MAP_ZOOM_RATIO = 1.5
 
+SESSION_SNAPSHOT_INTERVAL_MS = 5000
+
 
 class Window(QWidget):
     new_file_opened_signal = pyqtSignal()
@@ -56,6 +60,14 @@ class Window(QWidget):
         self.status_area = StatusArea(status_store=self.status_store)
         main_layout.addWidget(self.status_area.status_area_container)
 
+        self.session_snapshot_store = SessionSnapshotStore(status_store=self.status_store)
+        # Restore after the window is shown
+        QTimer.singleShot(0, self.restore_session)
+        # Save session snapshot periodically (written in background, skipped if nothing changed)
+        self.session_snapshot_timer = QTimer()
+        self.session_snapshot_timer.timeout.connect(self.save_session_snapshot)
+        self.session_snapshot_timer.start(SESSION_SNAPSHOT_INTERVAL_MS)
+
     def clear_statuses(self):
         """Remove status records from storage and area widget
         """
@@ -70,7 +82,10 @@ class Window(QWidget):
         self.clear_statuses()
 
         self.coordinates_handler.retrieve_coords(file_path=self.file_browse_area.path_input.text())
+        self.save_coordinates_cache()
         self.map_area.render_shapes(self.coordinates_handler.get_shapes())
+        # New file may lie elsewhere, so the view should follow its bounding rect
+        self.map_area.reset_view_scene_rect()
 
         self.status_area.update_status_area(statuses=self.status_store.get_statuses_list())
 
@@ -86,5 +101,92 @@ class Window(QWidget):
         """Clear status list only (not the widget) save coords to file and update status
         """
         self.status_store.clear_status_list()
-        self.coordinates_handler.save_coords(file_path=self.file_browse_area.path_input.text())
+        if self.coordinates_handler.save_coords(file_path=self.file_browse_area.path_input.text()):
+            self.save_coordinates_cache()
+        self.status_area.update_status_area(statuses=self.status_store.get_statuses_list())
+
+    def save_coordinates_cache(self):
+        """Save parsed coordinates of current source in background, so session is restored without parsing
+        """
+        source_size, source_mtime_ns = self.coordinates_handler.get_source_signature()
+        if source_size < 0:
+            return
+        self.session_snapshot_store.save_coordinates_cache_in_background(
+            coordinates_cache=CoordinatesCache(
+                source_path=self.coordinates_handler.get_source_file_path(),
+                source_size=source_size,
+                source_mtime_ns=source_mtime_ns,
+                coords_list=self.coordinates_handler.get_source_coords(),
+            ))
+
+    def save_session_snapshot(self):
+        """Report failed background writes, collect current session state and save it in background
+        """
+        write_error_statuses = self.session_snapshot_store.collect_write_errors()
+        if write_error_statuses:
+            self.status_area.update_status_area(statuses=write_error_statuses)
+
+        # Signature the shapes' positions correspond to, not the current one of the file
+        source_size, source_mtime_ns = self.coordinates_handler.get_source_signature()
+        if source_size < 0:
+            return
+
+        view_transform, view_scene_rect = self.map_area.get_view_state()
+        snapshot = SessionSnapshot(
+            source_path=self.coordinates_handler.get_source_file_path(),
+            source_size=source_size,
+            source_mtime_ns=source_mtime_ns,
+            removed_positions=self.coordinates_handler.get_removed_positions(),
+            selected_position=self.coordinates_handler.get_shape_position(self.map_area.get_focused_shape()),
+            view_transform=view_transform,
+            view_scene_rect=view_scene_rect,
+        )
+        # File is changed outside the app since it was parsed, positions do not refer to it anymore
+        if not snapshot.is_source_unchanged():
+            return
+        self.session_snapshot_store.save_in_background(snapshot=snapshot)
+
+    def restore_session(self):
+        """Restore last session (if its coordinates file is unchanged): coordinates are loaded from binary cache
+           (file is parsed only if there is no cache for it), removed shapes are dropped in bulk before rendering,
+           then selection and map view are restored
+        """
+        snapshot = self.session_snapshot_store.load()
+        if snapshot is None or not snapshot.is_source_unchanged():
+            self.status_area.update_status_area(statuses=self.status_store.get_statuses_list())
+            return
+
+        self.clear_statuses()
+
+        # Do not trigger manual input timer (and display_map) on path set
+        self.file_browse_area.path_input.blockSignals(True)
+        self.file_browse_area.path_input.setText(snapshot.source_path)
+        self.file_browse_area.path_input.blockSignals(False)
+
+        coords_list = self.session_snapshot_store.load_coordinates_cache(
+            source_path=snapshot.source_path, source_size=snapshot.source_size, source_mtime_ns=snapshot.source_mtime_ns)
+        if coords_list is None:
+            self.coordinates_handler.retrieve_coords(file_path=snapshot.source_path)
+            self.save_coordinates_cache()
+        else:
+            self.coordinates_handler.load_coords(
+                file_path=snapshot.source_path,
+                coords_list=coords_list,
+                source_signature=(snapshot.source_size, snapshot.source_mtime_ns),
+            )
+        self.coordinates_handler.remove_shapes_by_positions(positions=snapshot.removed_positions)
+        self.map_area.render_shapes(self.coordinates_handler.get_shapes())
+        self.map_area.set_view_state(view_transform=snapshot.view_transform, view_scene_rect=snapshot.view_scene_rect)
+
+        selected_shape = self.coordinates_handler.get_shape_by_position(position=snapshot.selected_position)
+        if selected_shape is not None:
+            self.map_area.focus_shape(shape=selected_shape)
+
+        self.status_store.add_status("Сессия восстановлена.")
         self.status_area.update_status_area(statuses=self.status_store.get_statuses_list())
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        self.session_snapshot_timer.stop()
+        self.save_session_snapshot()
+        self.session_snapshot_store.shutdown()
+        return super().closeEvent(event)